@@ -31,6 +31,9 @@ logging.basicConfig(
 
 # Named pipe path
 named_pipe_path = 'named_pipes/video_pipe'
+# 1 MiB read buffer: each fill takes as much of the pipe as is available, so a
+# frame's JPEG payload needs fewer read() syscalls than with the default 8 KiB
+pipe_buffer_size = 1 << 20
 
 # Global frame buffer and lock
 latest_frame = None
@@ -61,7 +64,7 @@ def frame_reader():
     global latest_frame
     logging.info(f"Starting frame reader thread. Opening named pipe {named_pipe_path} for reading.")
     try:
-        with open(named_pipe_path, 'rb') as pipe:
+        with open(named_pipe_path, 'rb', buffering=pipe_buffer_size) as pipe:
             while True:
                 boundary = pipe.readline()
                 if not boundary:
@@ -147,7 +150,12 @@ def add_signal():
 
     signal_type = data['type'].lower()
     signal_name = data['name']
-    signal_rssi = data.get('rssi', -60)  # default RSSI
+    try:
+        # Store RSSI as an int at ingest so consumers never need to coerce it
+        signal_rssi = int(data.get('rssi', -60))  # default RSSI
+    except (TypeError, ValueError):
+        logging.warning(f"Received invalid RSSI value: {data.get('rssi')}")
+        return jsonify({'error': 'Invalid data'}), 400
 
     with signals_lock:
         if signal_type not in signals_data:
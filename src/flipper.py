@@ -1,5 +1,7 @@
 # src/flipper.py
 
+import glob
+import os
 import serial
 import serial.tools.list_ports
 import logging
@@ -12,15 +14,32 @@ from shared import signals_data, signals_lock
 # Optional: If your code references config or other modules, import them here as needed
 # from config import config
 
+# Last port the Flipper Zero was found on
+_flipper_port = None
+
 def find_flipper_zero():
     """Locate the Flipper Zero port if connected."""
-    ports = serial.tools.list_ports.comports()
-    for port in ports:
-        if "Flipper" in port.description or "ttyACM" in port.device:
-            logging.info(f"Flipper Zero found on port: {port.device}")
-            return port.device
-    logging.warning("No Flipper Zero device found.")
-    return None
+    global _flipper_port
+    # The cached port stays valid for as long as its device node exists
+    if _flipper_port and os.path.exists(_flipper_port):
+        return _flipper_port
+
+    # udev's by-id symlinks name the device directly, without enumerating every port
+    by_id = glob.glob("/dev/serial/by-id/*Flipper*")
+    if by_id:
+        _flipper_port = os.path.realpath(by_id[0])
+    else:
+        _flipper_port = None
+        for port in serial.tools.list_ports.comports():
+            if "Flipper" in port.description or "ttyACM" in port.device:
+                _flipper_port = port.device
+                break
+
+    if _flipper_port:
+        logging.info(f"Flipper Zero found on port: {_flipper_port}")
+    else:
+        logging.warning("No Flipper Zero device found.")
+    return _flipper_port
 
 def is_flipper_connected():
     """Check if Flipper Zero is connected."""
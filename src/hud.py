@@ -2,166 +2,559 @@
 
 
 import cv2
+import functools
+from collections import defaultdict
+import numpy as np
 import os
 import logging
-import random
-
-# Configure logging for hud.py
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s:%(name)s:%(message)s",
-    handlers=[
-        logging.FileHandler("hud.log"),
-        logging.StreamHandler()
-    ]
-)
+import sys
+import zlib
+from pathlib import Path
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy blend is used without it
+    njit = None
+
 logger = logging.getLogger(__name__)
+_logging_configured = False
+
+def configure_logging():
+    """
+    Configures logging to hud.log and the console.
+
+    Runs on the first overlay_hud() call rather than at import, so importing the
+    module does not create hud.log or take over the root logger. Repeated calls
+    are ignored.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s:%(name)s:%(message)s",
+        handlers=[
+            logging.FileHandler("hud.log"),
+            logging.StreamHandler()
+        ]
+    )
 
-# Get the absolute path of the current file
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Icon directory, resolved once at import
+ICON_DIR = (Path(__file__).parent / "static" / "images" / "icons").resolve()
 
 # Paths to the icons
-ICON_DIR = os.path.join(BASE_DIR, "../src/static/images/icons")
-WIFI_ICON_PATH = os.path.join(ICON_DIR, "wifi_icon.png")
-BLUETOOTH_ICON_PATH = os.path.join(ICON_DIR, "bluetooth_icon.png")
-FLIPPER_ICON_PATH = os.path.join(ICON_DIR, "flipper_icon.png")  # Add a Flipper icon
+WIFI_ICON_PATH = sys.intern(str(ICON_DIR / "wifi_icon.png"))
+BLUETOOTH_ICON_PATH = sys.intern(str(ICON_DIR / "bluetooth_icon.png"))
+FLIPPER_ICON_PATH = sys.intern(str(ICON_DIR / "flipper_icon.png"))  # Add a Flipper icon
 
-# Normalize paths
-WIFI_ICON_PATH = os.path.normpath(WIFI_ICON_PATH)
-BLUETOOTH_ICON_PATH = os.path.normpath(BLUETOOTH_ICON_PATH)
-FLIPPER_ICON_PATH = os.path.normpath(FLIPPER_ICON_PATH)
+# Resized icons are cached per user, outside the (possibly read-only) install
+ICON_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "iq" / "icons"
+ICON_INTERPOLATION = cv2.INTER_AREA
 
-def load_icon(path):
+def load_icon(path, icon_size=None, interpolation=ICON_INTERPOLATION):
     """
     Load an icon image from the specified path.
 
+    When icon_size is given, the resized icon is cached as a raw .npy file in
+    ICON_CACHE_DIR, so later runs skip the PNG decode and resize. The cache
+    file name includes a checksum of the image bytes and the resize
+    parameters, so a changed image or resize setting never reuses a stale file.
+
     Args:
         path (str): Path to the icon image.
+        icon_size (tuple, optional): Size (width, height) to resize the icon to.
+        interpolation (int, optional): cv2 interpolation flag used for resizing.
 
     Returns:
         numpy.ndarray or None: Loaded image or None if it fails.
     """
-    icon = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    try:
+        data = Path(path).read_bytes()
+    except OSError as e:
+        logger.error("Unable to load icon from %s: %s", path, e)
+        return None
+
+    if icon_size is not None:
+        cache_path = ICON_CACHE_DIR / (
+            f"{Path(path).stem}_{zlib.crc32(data):08x}_{icon_size[0]}x{icon_size[1]}_i{interpolation}.npy"
+        )
+        try:
+            return np.load(cache_path, allow_pickle=False)
+        except (OSError, ValueError):
+            pass  # No usable cache yet; decode the image below
+
+    icon = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
     if icon is None:
-        logger.error(f"Unable to load icon from {path}")
+        logger.error("Unable to decode icon from %s", path)
+        return None
+
+    # Validate once here so the drawing code can assume a BGR or BGRA icon
+    if icon.ndim == 2:
+        icon = cv2.cvtColor(icon, cv2.COLOR_GRAY2BGR)
+    if icon.dtype != np.uint8 or icon.shape[2] not in (3, 4):
+        logger.error("Unsupported icon format %s %s in %s", icon.dtype, icon.shape, path)
+        return None
+
+    if icon_size is not None:
+        icon = cv2.resize(icon, icon_size, interpolation=interpolation)
+        try:
+            ICON_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write under a temporary name so a concurrent reader never sees a partial file
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, icon)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug("Unable to cache resized icon at %s: %s", cache_path, e)
     return icon
 
-# Load icons
-WIFI_ICON = load_icon(WIFI_ICON_PATH)
-BLUETOOTH_ICON = load_icon(BLUETOOTH_ICON_PATH)
-FLIPPER_ICON = load_icon(FLIPPER_ICON_PATH)
+# HUD drawing constants (BGRA, fully opaque on the HUD layer)
+SIGNAL_COLORS = {
+    "wifi": (0, 255, 0, 255),       # Green for Wi-Fi
+    "bluetooth": (255, 0, 0, 255),  # Blue for Bluetooth
+    "flipper": (0, 255, 255, 255),  # Yellow for Flipper
+    "object": (0, 0, 255, 255)      # Red for detected objects
+}
+TRACKED_COLOR = (0, 0, 255, 255)    # Red for the tracked signal
+TEXT_COLOR = (255, 255, 255, 255)   # White text
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.6
+FONT_THICKNESS = 2
+LINE_TYPE = cv2.LINE_4              # Box outlines are axis-aligned, no need for LINE_8/AA
+TEXT_LINE_TYPE = cv2.LINE_8         # Signal and object labels
+TRACKED_TEXT_LINE_TYPE = cv2.LINE_AA  # Only the tracking caption is antialiased
+BOX_THICKNESS = 2
+BOX_SIZE = (150, 50)                # Signal box (width, height)
+TRACKING_BOX_SIZE = (50, 50)        # Tracked signal marker (width, height)
+ICON_SIZE = (24, 24)                # Icon size inside the signal box
+LABEL_OFFSET = (ICON_SIZE[0] + 10, 30)  # Signal label origin relative to its box
+CAPTION_OFFSET_Y = -10              # Tracking/object captions sit just above their box
+
+# Use OpenCV's Transparent API (OpenCL) for the frame-wide composite when a device is present
+USE_OPENCL = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+
+def blend_icon(roi, icon, rows=slice(None), cols=slice(None)):
+    """
+    Alpha-blends a prepared icon onto a frame or layer ROI in place.
+
+    Computes (a*src + (255-a)*dst) / 255 in uint16 over all channels at once,
+    using the icon's precomputed a*src table and writing every intermediate
+    into its preallocated scratch buffers.
+
+    Args:
+        roi (numpy.ndarray): BGR or BGRA region the size of the icon region.
+        icon (dict): Icon prepared by prepare_icon() with an alpha channel.
+        rows (slice, optional): Rows of the icon to blend (for clipped icons).
+        cols (slice, optional): Columns of the icon to blend (for clipped icons).
+    """
+    channels = roi.shape[2]
+    acc = icon["scratch"][0][rows, cols, :channels]
+    tmp = icon["scratch"][1][rows, cols, :channels]
+
+    np.multiply(icon["inv_alpha"][rows, cols], roi, out=acc)
+    np.add(acc, icon["premul"][rows, cols, :channels], out=acc)
+
+    # Exact rounded division by 255: (v + 128 + ((v + 128) >> 8)) >> 8
+    np.add(acc, 128, out=acc)
+    np.right_shift(acc, 8, out=tmp)
+    np.add(acc, tmp, out=acc)
+    np.right_shift(acc, 8, out=acc)
+    np.copyto(roi, acc, casting="unsafe")
+
+if njit is not None:
+    # Compiled eagerly for 'A' (any) layout: frame ROIs and clipped icons are strided
+    # views, and contiguous arrays convert to it, so no call ever triggers a compile
+    @njit("void(uint8[:, :, :], uint8[:, :, :], uint16[:, :, :])", cache=True, fastmath=True)
+    def _blend_kernel(roi, src, alpha):
+        # Same result as blend_icon(), one pass over the pixels. The kernel works in
+        # 32-bit lanes, so round(v / 255) is a single multiply-shift: ((v + 127) * 0x8081) >> 23
+        height, width, channels = roi.shape
+        for j in range(height):
+            for i in range(width):
+                a = np.uint32(alpha[j, i, 0])
+                inv = 255 - a
+                for c in range(channels):
+                    v = a * src[j, i, c] + inv * roi[j, i, c] + 127
+                    roi[j, i, c] = (v * 0x8081) >> 23
+
+    def blend_icon_jit(roi, icon, rows=slice(None), cols=slice(None)):
+        """
+        Numba-compiled equivalent of blend_icon(), used when Numba is installed.
+
+        Args:
+            roi (numpy.ndarray): BGR or BGRA region the size of the icon region.
+            icon (dict): Icon prepared by prepare_icon() with an alpha channel.
+            rows (slice, optional): Rows of the icon to blend (for clipped icons).
+            cols (slice, optional): Columns of the icon to blend (for clipped icons).
+        """
+        _blend_kernel(roi, icon["src"][rows, cols], icon["alpha"][rows, cols])
+
+def copy_icon(roi, icon, rows=slice(None), cols=slice(None)):
+    """
+    Copies a prepared icon without an alpha channel onto a frame or layer ROI.
+
+    Args:
+        roi (numpy.ndarray): BGR or BGRA region the size of the icon region.
+        icon (dict): Icon prepared by prepare_icon().
+        rows (slice, optional): Rows of the icon to copy (for clipped icons).
+        cols (slice, optional): Columns of the icon to copy (for clipped icons).
+    """
+    roi[:] = icon["src"][rows, cols, :roi.shape[2]]
+
+def prepare_icon(icon, icon_size=ICON_SIZE):
+    """
+    Resize an icon once and precompute its alpha tables for blending.
+
+    Args:
+        icon (numpy.ndarray or None): Icon image as returned by load_icon().
+        icon_size (tuple, optional): Size (width, height) the icon is drawn at.
+
+    Returns:
+        dict or None: "src" (contiguous opaque BGRA uint8), "alpha" and
+        "inv_alpha" (uint16, shaped (h, w, 1) for broadcasting; None for icons
+        without an alpha channel), "premul" (uint16 alpha * src, None without
+        an alpha channel), two uint16 "scratch" buffers for
+        blend_icon(), and "draw", the blit function chosen for this icon
+        (blend_icon or copy_icon). Returns None if the icon failed to load.
+    """
+    if icon is None:
+        return None
+
+    icon_resized = icon
+    if icon.shape[1::-1] != tuple(icon_size):
+        icon_resized = cv2.resize(icon, icon_size, interpolation=cv2.INTER_AREA)
+    prepared = {
+        "src": None,
+        "alpha": None,
+        "inv_alpha": None,
+        "premul": None,
+        "scratch": (
+            np.empty((icon_size[1], icon_size[0], 4), dtype=np.uint16),
+            np.empty((icon_size[1], icon_size[0], 4), dtype=np.uint16),
+        ),
+        "draw": copy_icon,
+    }
+    if icon_resized.shape[2] == 4:  # Handle alpha channel
+        prepared["alpha"] = icon_resized[:, :, 3:4].astype(np.uint16)
+        prepared["inv_alpha"] = 255 - prepared["alpha"]
+        # On a premultiplied layer the alpha channel's source value is 255
+        prepared["src"] = icon_resized.copy()
+        prepared["src"][:, :, 3] = 255
+        prepared["premul"] = prepared["alpha"] * prepared["src"]
+        prepared["draw"] = blend_icon if njit is None else blend_icon_jit
+    else:
+        prepared["src"] = cv2.cvtColor(icon_resized, cv2.COLOR_BGR2BGRA)
+    return prepared
+
+# Load icons (already resized to ICON_SIZE, from ICON_CACHE_DIR when cached)
+WIFI_ICON = load_icon(WIFI_ICON_PATH, ICON_SIZE)
+BLUETOOTH_ICON = load_icon(BLUETOOTH_ICON_PATH, ICON_SIZE)
+FLIPPER_ICON = load_icon(FLIPPER_ICON_PATH, ICON_SIZE)
+
+# Last rendered HUD layer (as prepared by prepare_layer) and the inputs it was rendered from
+_hud_cache_key = None
+_hud_cache_layer = None
+
+# Prepared icon lookup by signal type (anything unrecognized falls back to the Flipper icon)
+ICONS = {
+    "wifi": prepare_icon(WIFI_ICON),
+    "bluetooth": prepare_icon(BLUETOOTH_ICON),
+    "flipper": prepare_icon(FLIPPER_ICON),
+}
+
+@functools.lru_cache(maxsize=4)
+def position_sampler(frame_width, frame_height):
+    """
+    Build a position sampler specialized for one frame size.
+
+    The bounds are computed (and clamped for small frames) once per frame
+    size instead of on every call. Positions are derived from a CRC of the
+    signal identity, so each signal lands on the same spot on every render
+    and across restarts, with no RNG or per-identity state.
+
+    Args:
+        frame_width (int): Width of the video frame.
+        frame_height (int): Height of the video frame.
+
+    Returns:
+        callable: Takes a hashable signal identity such as (type, name) and
+        returns its (x, y) top-left corner for a signal box.
+    """
+    x_span = max(50, frame_width - 200) - 50 + 1
+    y_span = max(50, frame_height - 200) - 50 + 1
+
+    def sample_position(identity):
+        # str hash() is salted per process; crc32 keeps layouts stable across runs
+        digest = zlib.crc32(repr(identity).encode())
+        return (50 + digest % x_span, 50 + (digest >> 16) % y_span)
+
+    return sample_position
+
+def prepare_layer(layer):
+    """
+    Precomputes everything composite_prepared_layer() needs from a HUD layer.
+
+    The layer only changes when the HUD is re-rendered, so its bounding box,
+    BGR planes and inverse alpha are derived once here instead of every frame.
+    A scratch buffer for the blend result is allocated alongside them.
+
+    Args:
+        layer (numpy.ndarray): Premultiplied BGRA layer.
+
+    Returns:
+        dict: "layer", "rect" ((x, y, w, h) of the visible pixels, or None if
+        the layer is empty), "bgr", "inv_alpha" and "scratch".
+    """
+    prepared = {"layer": layer, "rect": None, "bgr": None, "inv_alpha": None, "scratch": None}
+    x, y, w, h = cv2.boundingRect(cv2.extractChannel(layer, 3))
+    if w == 0 or h == 0:
+        return prepared
+
+    layer_roi = layer[y:y+h, x:x+w]
+    prepared["rect"] = (x, y, w, h)
+    prepared["bgr"] = cv2.cvtColor(layer_roi, cv2.COLOR_BGRA2BGR)
+    prepared["inv_alpha"] = cv2.cvtColor(cv2.bitwise_not(cv2.extractChannel(layer_roi, 3)), cv2.COLOR_GRAY2BGR)
+    prepared["scratch"] = np.empty_like(prepared["bgr"])
+    if USE_OPENCL:
+        # Keep the tables resident on the OpenCL device between frames
+        for name in ("bgr", "inv_alpha", "scratch"):
+            prepared[name] = cv2.UMat(prepared[name])
+    return prepared
+
+def composite_prepared_layer(frame, prepared):
+    """
+    Alpha-composites a layer prepared by prepare_layer() onto the frame.
+
+    Only the bounding rectangle of the layer's visible pixels is touched, and the
+    blend runs in OpenCV's vectorized arithmetic kernels into the scratch buffer.
+
+    Args:
+        frame (numpy.ndarray): BGR video frame, modified in place.
+        prepared (dict): Result of prepare_layer() for a layer the size of the frame.
+    """
+    if prepared["rect"] is None:
+        return
+
+    x, y, w, h = prepared["rect"]
+    roi = frame[y:y+h, x:x+w]
+    src = cv2.UMat(roi) if USE_OPENCL else roi
+    scratch = prepared["scratch"]
+
+    # frame = layer_bgr + frame * (255 - layer_alpha) / 255
+    cv2.multiply(src, prepared["inv_alpha"], dst=scratch, scale=1 / 255.0)
+    cv2.add(scratch, prepared["bgr"], dst=scratch)
+    roi[:] = scratch.get() if USE_OPENCL else scratch
+
+def composite_layer(frame, layer):
+    """
+    Alpha-composites a premultiplied BGRA HUD layer onto the frame in one pass.
+
+    Args:
+        frame (numpy.ndarray): BGR video frame, modified in place.
+        layer (numpy.ndarray): Premultiplied BGRA layer with the same height and width.
+    """
+    composite_prepared_layer(frame, prepare_layer(layer))
 
-def overlay_box(frame, position, label, color, icon=None, icon_size=(24, 24)):
+@functools.lru_cache(maxsize=256)
+def format_label(name, rssi):
+    """
+    Formats a signal box label, memoized since (name, RSSI) pairs repeat across renders.
+
+    Args:
+        name (str): Signal name.
+        rssi (int or str): Signal strength in dBm, or "N/A".
+
+    Returns:
+        str: Label text such as "MyNetwork (-60 dBm)".
+    """
+    return f"{name} ({rssi} dBm)"
+
+def normalize_position(position):
+    """
+    Converts a position to an (x, y) tuple of ints.
+
+    Args:
+        position (tuple, list, numpy.ndarray or None): Position from a signal dict.
+
+    Returns:
+        tuple or None: (x, y), or None if no position is given.
+    """
+    if position is None or len(position) == 0:
+        return None
+    return tuple(map(int, position))
+
+def box_corners(position, size):
+    """
+    Returns the four corners of an axis-aligned box as a polygon.
+
+    Args:
+        position (tuple): (x, y) coordinates for the top-left corner.
+        size (tuple): (width, height) of the box.
+
+    Returns:
+        list: Corner points in drawing order, suitable for cv2.polylines.
+    """
+    x, y = position
+    w, h = size
+    return [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+
+def draw_boxes(frame, boxes_by_color):
+    """
+    Draws box outlines with a single cv2.polylines call per color.
+
+    Args:
+        frame (numpy.ndarray): The video frame or HUD layer.
+        boxes_by_color (dict): Maps a color to a list of box_corners() polygons.
+    """
+    for color, boxes in boxes_by_color.items():
+        cv2.polylines(frame, np.asarray(boxes, dtype=np.int32), True, color, BOX_THICKNESS, lineType=LINE_TYPE)
+
+def overlay_box(frame, position, label, color, icon=None, border=True):
     """
     Overlays a rectangular box with an optional icon and label text on the frame.
 
     Args:
-        frame (numpy.ndarray): The video frame.
+        frame (numpy.ndarray): The video frame (BGR) or a premultiplied BGRA HUD layer.
         position (tuple): (x, y) coordinates for the top-left corner of the box.
         label (str): Text label to display.
-        color (tuple): BGR color for the box border.
-        icon (numpy.ndarray, optional): Icon image to overlay.
-        icon_size (tuple, optional): Desired size for the icon.
+        color (tuple): BGR(A) color for the box border; pass alpha 255 when drawing on a layer.
+        icon (dict, optional): Icon prepared by prepare_icon().
+        border (bool, optional): Draw the box outline; pass False when the caller
+            batches outlines with draw_boxes().
     """
     x, y = position
-    box_w, box_h = 150, 50  # Box size
+    box_w, box_h = BOX_SIZE
 
     # Draw the rectangle
-    cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), color, 2)
+    if border:
+        cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), color, BOX_THICKNESS, lineType=LINE_TYPE)
 
-    # Overlay the icon in the top-left corner of the box
+    # Overlay the icon in the top-left corner of the box, clipped to the frame
     if icon is not None:
-        try:
-            icon_resized = cv2.resize(icon, icon_size, interpolation=cv2.INTER_AREA)
-            if icon_resized.shape[2] == 4:  # Handle alpha channel
-                alpha_icon = icon_resized[:, :, 3] / 255.0
-                for c in range(3):
-                    frame[y:y+icon_size[1], x:x+icon_size[0], c] = (
-                        alpha_icon * icon_resized[:, :, c] +
-                        (1 - alpha_icon) * frame[y:y+icon_size[1], x:x+icon_size[0], c]
-                    )
-            else:
-                frame[y:y+icon_size[1], x:x+icon_size[0]] = icon_resized
-        except Exception as e:
-            logger.error(f"Error overlaying icon at {position}: {e}")
+        icon_h, icon_w = icon["src"].shape[:2]
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame_w, x + icon_w), min(frame_h, y + icon_h)
+        if x1 > x0 and y1 > y0:
+            roi = frame[y0:y1, x0:x1]
+            icon["draw"](roi, icon, slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
 
     # Add label text
-    text_x = x + icon_size[0] + 10
-    text_y = y + 30
-    font_scale = 0.6
-    font_thickness = 2
-    text_color = (255, 255, 255)
+    text_x = x + LABEL_OFFSET[0]
+    text_y = y + LABEL_OFFSET[1]
     cv2.putText(
         frame, label, (text_x, text_y),
-        cv2.FONT_HERSHEY_SIMPLEX, font_scale,
-        text_color, font_thickness
+        FONT, FONT_SCALE,
+        TEXT_COLOR, FONT_THICKNESS, TEXT_LINE_TYPE
     )
 
-def overlay_hud(frame, signals, selected_signal, detected_objects=None):
+def hud_state_key(frame, signals, selected_signal, detected_objects):
     """
-    Overlays detected Wi-Fi, Bluetooth, and Flipper signals on the frame.
+    Builds a comparable key describing everything the HUD layer depends on.
 
     Args:
-        frame (numpy.ndarray): Current video frame.
+        frame (numpy.ndarray): Current video frame (only its size is used).
+        signals (list): List of combined signals.
+        selected_signal (dict): The tracked signal's data.
+        detected_objects (list): List of detected objects.
+
+    Returns:
+        tuple: Key that compares equal when the rendered HUD would be identical.
+    """
+    return (
+        frame.shape[:2],
+        tuple(
+            (sig.get("type"), sig.get("name"), sig.get("rssi"), normalize_position(sig.get("position")))
+            for sig in signals
+        ),
+        (selected_signal.get("type"), selected_signal.get("name"), normalize_position(selected_signal.get("position"))),
+        tuple((obj.get("label"), obj.get("bbox")) for obj in detected_objects or ()),
+    )
+
+def render_hud_layer(frame_height, frame_width, signals, selected_signal, detected_objects=None, hud_layer=None,
+                     *, create_fallback=True, highlight_tracked=True):
+    """
+    Renders the HUD into an off-screen premultiplied BGRA layer.
+
+    Args:
+        frame_height (int): Height of the video frame.
+        frame_width (int): Width of the video frame.
         signals (list): List of combined signals (Wi-Fi, Bluetooth, Flipper, etc.).
         selected_signal (dict): The tracked signal's data with "type", "name", and optional "position".
         detected_objects (list): List of detected objects (each with "bbox" and "label").
+        hud_layer (numpy.ndarray, optional): Previous layer buffer to clear and reuse.
+        create_fallback (bool): Draw a placeholder box when no signal matches the tracked one.
+        highlight_tracked (bool): Mark the tracked signal position in TRACKED_COLOR.
 
     Returns:
-        numpy.ndarray: The frame with HUD overlays applied.
+        numpy.ndarray: The HUD layer, ready for composite_layer().
     """
-    frame_height, frame_width = frame.shape[:2]
-
-    # Define color properties
-    colors = {
-        "wifi": (0, 255, 0),       # Green for Wi-Fi
-        "bluetooth": (255, 0, 0),  # Blue for Bluetooth
-        "flipper": (0, 255, 255),  # Yellow for Flipper
-        "object": (0, 0, 255)      # Red for detected objects
-    }
-    tracked_color = (0, 0, 255)    # Red for the tracked signal
-    text_color = (255, 255, 255)   # White text
+    if hud_layer is not None and hud_layer.shape == (frame_height, frame_width, 4):
+        hud_layer.fill(0)
+    else:
+        hud_layer = np.zeros((frame_height, frame_width, 4), dtype=np.uint8)
+    sample_position = position_sampler(frame_width, frame_height)
 
     # Filter and highlight tracked signals
+    selected_position = normalize_position(selected_signal.get("position"))
     tracked_type = selected_signal.get("type")
     tracked_name = selected_signal.get("name")
     filtered_signals = signals
 
     # Filter signals based on the tracked type and name
     if tracked_type and tracked_name:
-        filtered_signals = [
-            sig for sig in signals
-            if sig.get("type") == tracked_type and sig.get("name") == tracked_name
-        ]
+        # Readings are appended as they arrive, so scan from the newest and stop
+        # at the first match instead of stacking older readings on the same box
+        match = next(
+            (sig for sig in reversed(signals)
+             if sig.get("name") == tracked_name and sig.get("type") == tracked_type),
+            None
+        )
+        filtered_signals = [match] if match is not None else []
         # Add a fallback signal if none match
-        if not filtered_signals:
+        if create_fallback and not filtered_signals:
             fallback_signal = {
                 "type": tracked_type,
                 "name": tracked_name,
                 "rssi": "N/A",
-                "position": selected_signal.get("position") or (
-                    random.randint(50, frame_width - 200),
-                    random.randint(50, frame_height - 200)
-                )
+                "position": selected_position or sample_position((tracked_type, tracked_name))
             }
             filtered_signals.append(fallback_signal)
 
+    # Box outlines are collected per color and drawn in one batch before any
+    # icons or text, so each color costs a single cv2.polylines call.
+    boxes_by_color = defaultdict(list)
+    signal_boxes = []  # (position, label, color, icon) for each signal box
+    labels = []        # (text, origin, color) for tracking/object labels
+
+    tracked_position = selected_position if highlight_tracked else None
+
     # Overlay signals
+    default_icon = ICONS["flipper"]
     for signal in filtered_signals:
-        position = signal.get("position", (
-            random.randint(50, frame_width - 200),
-            random.randint(50, frame_height - 200)
-        ))
-        label = f"{signal.get('name', 'Unknown')} ({signal.get('rssi', 'N/A')} dBm)"
-        color = colors.get(signal.get("type"), (255, 255, 255))
-        icon = WIFI_ICON if signal.get("type") == "wifi" else BLUETOOTH_ICON if signal.get("type") == "bluetooth" else FLIPPER_ICON
-        overlay_box(frame, position, label, color, icon)
-
-    # Highlight the tracked signal position
-    if selected_signal.get("position"):
-        x, y = selected_signal["position"]
-        cv2.rectangle(frame, (x, y), (x + 50, y + 50), tracked_color, 2)
-        cv2.putText(frame, "Tracking", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, tracked_color, 2)
+        signal_type = signal.get("type")
+        name = signal.get("name")
+        position = normalize_position(signal.get("position"))
+        if position is None:
+            position = sample_position((signal_type, name))
+        label = format_label("Unknown" if name is None else name, signal.get("rssi", "N/A"))
+        color = SIGNAL_COLORS.get(signal_type, TEXT_COLOR)
+        icon = ICONS.get(signal_type, default_icon)
+        if tracked_position is not None and position == tracked_position:
+            # The box already outlines the tracked position: draw it in the tracking
+            # color instead of stacking a second marker on the same pixels.
+            color = TRACKED_COLOR
+            labels.append(("Tracking", (position[0], position[1] + CAPTION_OFFSET_Y), TRACKED_COLOR))
+            tracked_position = None
+        boxes_by_color[color].append(box_corners(position, BOX_SIZE))
+        signal_boxes.append((position, label, color, icon))
+
+    # Highlight the tracked signal position when no signal box sits on it
+    if tracked_position is not None:
+        x, y = tracked_position
+        boxes_by_color[TRACKED_COLOR].append(box_corners((x, y), TRACKING_BOX_SIZE))
+        labels.append(("Tracking", (x, y + CAPTION_OFFSET_Y), TRACKED_COLOR))
 
     # Overlay detected objects
     if detected_objects:
@@ -169,7 +562,71 @@ def overlay_hud(frame, signals, selected_signal, detected_objects=None):
             bbox = obj.get("bbox", (0, 0, 0, 0))  # (x, y, w, h)
             label = obj.get("label", "Object")
             x, y, w, h = bbox
-            cv2.rectangle(frame, (x, y), (x + w, y + h), colors["object"], 2)
-            cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, text_color, 2)
+            boxes_by_color[SIGNAL_COLORS["object"]].append(box_corners((x, y), (w, h)))
+            labels.append((label, (x, y + CAPTION_OFFSET_Y), TEXT_COLOR))
+
+    draw_boxes(hud_layer, boxes_by_color)
+
+    for position, label, color, icon in signal_boxes:
+        overlay_box(hud_layer, position, label, color, icon, border=False)
+
+    for text, origin, color in labels:
+        line_type = TRACKED_TEXT_LINE_TYPE if color == TRACKED_COLOR else TEXT_LINE_TYPE
+        cv2.putText(hud_layer, text, origin, FONT, FONT_SCALE, color, FONT_THICKNESS, line_type)
+
+    return hud_layer
+
+def overlay_hud(frame, signals, selected_signal, detected_objects=None, *, create_fallback=True, highlight_tracked=True):
+    """
+    Overlays detected Wi-Fi, Bluetooth, and Flipper signals on the frame.
+
+    The HUD layer is only re-rendered when its inputs change; otherwise the
+    layer from the previous frame is composited again.
+
+    Args:
+        frame (numpy.ndarray): Current video frame.
+        signals (list): List of combined signals (Wi-Fi, Bluetooth, Flipper, etc.).
+        selected_signal (dict): The tracked signal's data with "type", "name", and optional "position".
+        detected_objects (list): List of detected objects (each with "bbox" and "label").
+        create_fallback (bool): Draw a placeholder box when no signal matches the tracked one.
+        highlight_tracked (bool): Mark the tracked signal position in TRACKED_COLOR.
+
+    Returns:
+        numpy.ndarray: The frame with HUD overlays applied.
+    """
+    global _hud_cache_key, _hud_cache_layer
+
+    key = (hud_state_key(frame, signals, selected_signal, detected_objects), create_fallback, highlight_tracked)
+    if key != _hud_cache_key:
+        configure_logging()  # No-op after the first frame, which always misses the cache
+        frame_height, frame_width = frame.shape[:2]
+        previous_layer = _hud_cache_layer["layer"] if _hud_cache_layer else None
+        hud_layer = render_hud_layer(
+            frame_height, frame_width, signals, selected_signal, detected_objects, hud_layer=previous_layer,
+            create_fallback=create_fallback, highlight_tracked=highlight_tracked
+        )
+        _hud_cache_layer = prepare_layer(hud_layer)
+        _hud_cache_key = key
+
+    composite_prepared_layer(frame, _hud_cache_layer)
 
     return frame
+
+def overlay_hud_split(frame, wifi_signals, bluetooth_signals, selected_signal, detected_objects=None, **kwargs):
+    """
+    Compatibility wrapper for callers that keep Wi-Fi and Bluetooth signals in separate lists.
+
+    Args:
+        frame (numpy.ndarray): Current video frame.
+        wifi_signals (list): Wi-Fi signals; tagged with type "wifi".
+        bluetooth_signals (list): Bluetooth signals; tagged with type "bluetooth".
+        selected_signal (dict): The tracked signal's data with "type", "name", and optional "position".
+        detected_objects (list): List of detected objects (each with "bbox" and "label").
+        **kwargs: Passed through to overlay_hud().
+
+    Returns:
+        numpy.ndarray: The frame with HUD overlays applied.
+    """
+    signals = [{**sig, "type": "wifi"} for sig in wifi_signals]
+    signals.extend({**sig, "type": "bluetooth"} for sig in bluetooth_signals)
+    return overlay_hud(frame, signals, selected_signal, detected_objects, **kwargs)
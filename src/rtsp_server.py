@@ -1,10 +1,78 @@
+import logging
+import logging.handlers
+import queue
+
 import gi
-print("PyGObject installed successfully!")
 
 gi.require_version('Gst', '1.0')
 gi.require_version('GstRtspServer', '1.0')
 from gi.repository import Gst, GstRtspServer, GLib
 
+Gst.init(None)
+
+# Log through a queue so the GLib main loop never blocks on console I/O;
+# the listener thread does the actual writes
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+_log_queue = queue.Queue(-1)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s:%(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _stream_handler)
+_log_listener.start()
+
+# H.264 encoders in order of preference, all at 500 kbit/s: the Raspberry Pi
+# VideoCore and Jetson NVENC hardware blocks first, x264 on the CPU last. Each
+# fragment follows videoconvert; nvv4l2h264enc only accepts NVMM buffers, so
+# nvvidconv copies frames into NVMM memory first.
+H264_ENCODERS = [
+    ('v4l2h264enc', 'v4l2h264enc extra-controls="controls,video_bitrate=500000" ! video/x-h264,level=(string)4 ! h264parse'),
+    ('nvv4l2h264enc', 'nvvidconv ! video/x-raw(memory:NVMM) ! nvv4l2h264enc bitrate=500000 insert-sps-pps=true ! h264parse'),
+    ('x264enc', 'x264enc tune=zerolatency bitrate=500 speed-preset=ultrafast'),
+]
+ENCODER_PROBE_TIMEOUT = 5 * Gst.SECOND  # Time allowed to encode the probe frame
+
+
+def encoder_works(launch):
+    """
+    Check that an encoder fragment links, negotiates and encodes a test frame.
+
+    An element can be installed yet unusable (no device node, unsupported
+    memory type), so each candidate is run once in a throwaway pipeline.
+    """
+    try:
+        pipeline = Gst.parse_launch(f'videotestsrc num-buffers=1 ! videoconvert ! {launch} ! fakesink')
+    except GLib.Error as e:
+        logger.warning("Encoder pipeline '%s' failed to build: %s", launch, e)
+        return False
+
+    try:
+        pipeline.set_state(Gst.State.PLAYING)
+        message = pipeline.get_bus().timed_pop_filtered(
+            ENCODER_PROBE_TIMEOUT, Gst.MessageType.ERROR | Gst.MessageType.EOS
+        )
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+
+    if message is None:
+        logger.warning("Encoder pipeline '%s' timed out", launch)
+        return False
+    if message.type == Gst.MessageType.ERROR:
+        error, _ = message.parse_error()
+        logger.warning("Encoder pipeline '%s' failed: %s", launch, error.message)
+        return False
+    return True
+
+
+def select_encoder():
+    """Return the launch-line fragment for the first H.264 encoder that actually works here."""
+    for element, launch in H264_ENCODERS:
+        if Gst.ElementFactory.find(element) and encoder_works(launch):
+            logger.info("Using H.264 encoder %s", element)
+            return launch
+    logger.warning("No H.264 encoder passed its probe; falling back to x264enc")
+    return H264_ENCODERS[-1][1]
+
 
 class RTSPServer:
     def __init__(self):
@@ -12,7 +80,7 @@ class RTSPServer:
 
         # Factory setup
         self.factory = GstRtspServer.RTSPMediaFactory()
-        self.factory.set_launch('( v4l2src device=/dev/video0 ! videoconvert ! x264enc tune=zerolatency bitrate=500 speed-preset=ultrafast ! rtph264pay name=pay0 pt=96 )')
+        self.factory.set_launch(f'( v4l2src device=/dev/video0 ! videoconvert ! {select_encoder()} ! rtph264pay name=pay0 pt=96 )')
         self.factory.set_shared(True)
 
         # Attach factory to mount points
@@ -23,17 +91,16 @@ class RTSPServer:
 
         # Start the server
         self.server.attach(None)
-        print("RTSP server is running at rtsp://192.168.0.143:8554/test")
+        logger.info("RTSP server is running at rtsp://192.168.0.143:8554/test")
 
     def on_client_connected(self, server, client):
-        print("Client connected:", client)
+        logger.debug("Client connected: %s", client)
 
     # To handle session signals
     def on_session_removed(self, session):
-        print("Session removed:", session)
+        logger.debug("Session removed: %s", session)
 
 
-Gst.init(None)
 server = RTSPServer()
 loop = GLib.MainLoop()
 loop.run()
@@ -1,15 +1,20 @@
 import os
-import cv2
-import numpy as np
 
 named_pipe_path = 'named_pipes/video_pipe'
+pipe_buffer_size = 1 << 20  # Same read buffer as app.py's frame_reader()
 output_dir = 'frames'
 
 os.makedirs(output_dir, exist_ok=True)
 
+def is_jpeg(data):
+    """Check the JPEG start/end markers of a frame payload."""
+    return bytes(data[:2]) == b'\xff\xd8' and bytes(data[-4:]).rstrip(b'\r\n').endswith(b'\xff\xd9')
+
 def read_pipe():
     frame_count = 0
-    with open(named_pipe_path, 'rb') as pipe:
+    # Frame payloads are read into one reusable buffer instead of a new bytes object per frame
+    buf = bytearray(1 << 20)
+    with open(named_pipe_path, 'rb', buffering=pipe_buffer_size) as pipe:
         while True:
             # Read boundary
             boundary_line = pipe.readline()
@@ -29,11 +34,17 @@ def read_pipe():
 
                 content_length = int(headers.get('content-length', 0))
                 if content_length:
-                    frame_data = pipe.read(content_length)
-                    frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
+                    if content_length > len(buf):
+                        buf = bytearray(1 << (content_length - 1).bit_length())
+                    frame_data = memoryview(buf)[:content_length]
+                    if pipe.readinto(frame_data) != content_length:
+                        continue
+                    # The payload is already a JPEG: check its start/end markers and
+                    # save it as-is instead of decoding and re-encoding it
+                    if is_jpeg(frame_data):
                         frame_file = os.path.join(output_dir, f'frame_{frame_count:04d}.jpg')
-                        cv2.imwrite(frame_file, frame)
+                        with open(frame_file, 'wb') as f:
+                            f.write(frame_data)
                         print(f"Saved frame to {frame_file}")
                         frame_count += 1
 
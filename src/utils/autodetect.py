@@ -3,10 +3,23 @@ import cv2
 import numpy as np
 import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s:%(message)s")
 
+# Detection filtering thresholds
+CONFIDENCE_THRESHOLD = 0.5
+NMS_THRESHOLD = 0.4
+
+# DNN backends in order of preference: (name, backend, target)
+DNN_BACKENDS = [
+    ("CUDA FP16", cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16),
+    ("OpenVINO", cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU),
+    ("CPU", cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+]
+
 class AutoDetection:
     def __init__(self):
         # Paths to model files
@@ -28,79 +41,185 @@ class AutoDetection:
 
         # Load YOLO network
         self.net = cv2.dnn.readNet(self.model_weights, self.model_cfg)
-        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.layer_names = self.net.getUnconnectedOutLayersNames()
+        self._net_lock = threading.Lock()  # One setInput()/forward() pair at a time
+
+        # Background inference: one worker, at most one frame waiting for it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autodetect")
+        self._dispatch_lock = threading.Lock()  # Guards _future, _next_frame and latest_objects
+        self._future = None
+        self._next_frame = None
+        self.latest_objects = []
 
         # Load class labels
         with open(self.classes_file, "r") as f:
             self.classes = f.read().strip().split("\n")
 
-        logging.info("YOLO model loaded successfully.")
+        # Use the first available backend that survives a warm-up pass. The
+        # first forward pass also pays OpenCV's lazy initialization, so it is
+        # done here instead of on the first real frame.
+        for name, backend, target in self._available_backends():
+            self.net.setPreferableBackend(backend)
+            self.net.setPreferableTarget(target)
+            try:
+                self._warm_up()
+            except cv2.error as e:
+                if backend == cv2.dnn.DNN_BACKEND_OPENCV:
+                    raise
+                logging.warning(f"{name} inference failed ({e}); trying the next backend.")
+                continue
+            self.backend = name
+            break
+
+        logging.info(f"YOLO model loaded successfully ({self.backend}).")
+
+    @staticmethod
+    def _available_backends():
+        """
+        Returns the (name, backend, target) entries of DNN_BACKENDS this OpenCV build supports.
+        """
+        available = []
+        for name, backend, target in DNN_BACKENDS:
+            if backend == cv2.dnn.DNN_BACKEND_OPENCV:
+                available.append((name, backend, target))
+                continue
+            try:
+                if target not in cv2.dnn.getAvailableTargets(backend):
+                    continue
+                if backend == cv2.dnn.DNN_BACKEND_CUDA and cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                    continue
+            except (AttributeError, cv2.error):
+                continue
+            available.append((name, backend, target))
+        return available
+
+    def _warm_up(self):
+        """
+        Runs one forward pass on a blank frame.
+        """
+        self._set_input(np.zeros((416, 416, 3), np.uint8))
+        self.net.forward(self.layer_names)
+
+    def _set_input(self, frame):
+        """
+        Feeds a frame to the network as an 8-bit blob.
+
+        The 1/255 scaling is passed to setInput() so the DNN backend applies it
+        during inference instead of materializing a float32 blob here.
+        """
+        blob = cv2.dnn.blobFromImage(
+            frame, size=(416, 416), swapRB=True, crop=False, ddepth=cv2.CV_8U
+        )
+        self.net.setInput(blob, scalefactor=1 / 255.0)
 
     def detect_objects(self, frame):
         """
         Detects objects in the given frame using YOLO.
+
+        Safe to call from any thread, including while a submitted frame is
+        being processed; inference on the shared network is serialized.
         """
         height, width = frame.shape[:2]
 
-        # Preprocess frame
-        blob = cv2.dnn.blobFromImage(
-            frame, 1 / 255.0, (416, 416), (0, 0, 0), swapRB=True, crop=False
+        # Preprocess frame and perform the forward pass
+        with self._net_lock:
+            self._set_input(frame)
+            outputs = self.net.forward(self.layer_names)
+
+        # Score every candidate at once: rows are (cx, cy, w, h, objectness, class scores...)
+        detections = np.vstack(outputs)
+        scores = detections[:, 5:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+
+        # Filter detections
+        keep = confidences > CONFIDENCE_THRESHOLD
+        if not keep.any():
+            return []
+        class_ids, confidences = class_ids[keep], confidences[keep]
+        center_x, center_y, w, h = (
+            detections[keep, :4] * np.array([width, height, width, height])
+        ).astype(int).T
+
+        # Calculate coordinates
+        x = (center_x - w / 2).astype(int)
+        y = (center_y - h / 2).astype(int)
+        boxes = np.column_stack((x, y, w, h))
+
+        # Drop overlapping duplicates of the same object
+        indices = cv2.dnn.NMSBoxes(
+            boxes.tolist(), confidences.tolist(), CONFIDENCE_THRESHOLD, NMS_THRESHOLD
         )
-        self.net.setInput(blob)
-
-        # Perform forward pass
-        layer_names = self.net.getUnconnectedOutLayersNames()
-        outputs = self.net.forward(layer_names)
 
         objects = []
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
+        for i in np.asarray(indices).reshape(-1):
+            label = f"{self.classes[class_ids[i]]}: {confidences[i]:.2f}"
+            objects.append({"bbox": tuple(int(v) for v in boxes[i]), "label": label})
 
-                # Filter detections
-                if confidence > 0.5:
-                    box = detection[:4] * np.array([width, height, width, height])
-                    (center_x, center_y, w, h) = box.astype("int")
+        return objects
 
-                    # Calculate coordinates
-                    x = int(center_x - (w / 2))
-                    y = int(center_y - (h / 2))
-                    label = f"{self.classes[class_id]}: {confidence:.2f}"
+    def submit(self, frame):
+        """
+        Queues a frame for detection on the background worker and returns immediately.
 
-                    objects.append({"bbox": (x, y, int(w), int(h)), "label": label})
+        OpenCV releases the GIL during the forward pass, so decoding the next
+        frame overlaps with inference on this one. If the worker is busy, the
+        frame replaces any frame still waiting, keeping latency bounded. The
+        frame must not be modified after it is submitted.
 
-        return objects
+        submit() and poll() may be called from different threads, e.g. a
+        capture thread submitting and a drawing thread polling.
+        """
+        with self._dispatch_lock:
+            self._next_frame = frame
+            self._dispatch()
 
-    def associate_signals_with_objects(self, objects, signals):
+    def poll(self):
         """
-        Associates detected objects with signals (e.g., Wi-Fi, Bluetooth).
+        Returns the most recent completed detections, which may be a few frames old.
         """
-        associated_data = []
-
-        for obj in objects:
-            obj_x, obj_y, obj_w, obj_h = obj["bbox"]
-            obj_center = (obj_x + obj_w // 2, obj_y + obj_h // 2)
+        with self._dispatch_lock:
+            self._dispatch()
+            return self.latest_objects
 
-            best_match = None
-            best_distance = float("inf")
-
-            for signal in signals:
-                signal_position = signal.get("position")  # Triangulated position
-                if signal_position:
-                    distance = np.linalg.norm(
-                        np.array(obj_center) - np.array(signal_position)
-                    )
-                    if distance < best_distance:
-                        best_distance = distance
-                        best_match = signal
+    def _dispatch(self):
+        """
+        Collects a finished background result and starts the waiting frame, if any.
 
-            if best_match:
-                associated_data.append({"object": obj, "signal": best_match})
+        Called with _dispatch_lock held.
+        """
+        if self._future is not None:
+            if not self._future.done():
+                return
+            try:
+                self.latest_objects = self._future.result()
+            except Exception as e:
+                logging.error(f"Background detection failed: {e}")
+            self._future = None
+
+        if self._next_frame is not None:
+            frame, self._next_frame = self._next_frame, None
+            self._future = self._executor.submit(self.detect_objects, frame)
 
-        return associated_data
+    def associate_signals_with_objects(self, objects, signals):
+        """
+        Associates detected objects with signals (e.g., Wi-Fi, Bluetooth).
+        """
+        positioned = [signal for signal in signals if signal.get("position")]  # Triangulated position
+        if not objects or not positioned:
+            return []
+
+        # Squared distances between every object center and every signal, shape (objects, signals)
+        bboxes = np.array([obj["bbox"] for obj in objects])
+        centers = bboxes[:, :2] + bboxes[:, 2:] // 2
+        signal_positions = np.array([signal["position"] for signal in positioned])
+        d2 = ((centers[:, None, :] - signal_positions[None, :, :]) ** 2).sum(axis=-1)
+        best = d2.argmin(axis=1)
+
+        return [
+            {"object": obj, "signal": positioned[i]}
+            for obj, i in zip(objects, best)
+        ]
 
 # Singleton instance
 autodetect = AutoDetection()
\ No newline at end of file
@@ -5,7 +5,19 @@ from bleak import BleakScanner
 import asyncio
 import logging
 import math
-from typing import List, Dict
+import numpy as np
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import List, Dict, Tuple
+
+try:
+    from pyroute2 import IW
+except ImportError:  # pyroute2 is optional; Wi-Fi scans fall back to iwlist without it
+    IW = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s:%(message)s")
@@ -14,72 +26,286 @@ logger = logging.getLogger(__name__)
 # Configurable constants
 WIFI_SCAN_INTERFACE = "wlan0"  # Default Wi-Fi interface
 WIFI_SCAN_DURATION = 5  # Duration for BLE scanning
+WIFI_PROC_PATH = "/proc/net/wireless"  # Link stats of the associated access point
 PATH_LOSS_CONSTANTS = {
     "wifi": {"A": -50, "n": 2},  # RSSI at 1 meter, Path loss exponent for Wi-Fi
     "bluetooth": {"A": -59, "n": 2},  # RSSI at 1 meter, Path loss exponent for Bluetooth
 }
 
-def detect_wifi() -> List[Dict[str, any]]:
+# iwlist scan output fields, matched on the raw bytes
+_ESSID_RE = re.compile(rb"ESSID:(.*)")
+_SIGNAL_LEVEL_RE = re.compile(rb"Signal level[=:]\s*(\S+)")
+
+# nl80211 socket, opened on the first netlink scan
+_iw = None
+
+# Persistent BLE scanner state, set up by _start_bluetooth_scanner()
+BLE_START_TIMEOUT = 10  # Seconds to wait for the scanner to start or stop
+_ble_loop = None
+_ble_scanner = None
+_ble_scan_started = None
+_ble_start_lock = threading.Lock()
+_ble_failed = threading.Event()  # Set when the scanner's event loop reports an error
+_ble_sightings_lock = threading.Condition()  # Notified on every new sighting
+_ble_sightings = {}  # address -> (monotonic time, name, rssi) of its latest advertisement
+
+def _scan_wifi_netlink() -> List[Tuple[str, int]]:
+    """
+    Scans for Wi-Fi networks over nl80211 (the netlink API behind `iw`).
+
+    Returns:
+        list: (SSID, signal strength in dBm) pairs.
+    """
+    global _iw
+    if _iw is None:
+        _iw = IW()  # Keep the netlink socket open across scans
+    ifindex = _iw.get_interfaces_dict()[WIFI_SCAN_INTERFACE][0]
+
+    results = []
+    for bss in _iw.scan(ifindex, flush_cache=True):
+        attrs = bss.get_attr("NL80211_ATTR_BSS")
+        if attrs is None:
+            continue
+        elements = attrs.get_attr("NL80211_BSS_INFORMATION_ELEMENTS") or {}
+        signal_mbm = attrs.get_attr("NL80211_BSS_SIGNAL_MBM")
+        if "SSID" in elements and signal_mbm is not None:
+            ssid = sys.intern(elements["SSID"].decode("utf-8", errors="replace"))
+            results.append((ssid, int(signal_mbm["VALUE"] / 100)))  # mBm -> dBm
+    return results
+
+def _scan_wifi_iwlist() -> List[Tuple[str, int]]:
+    """
+    Scans for Wi-Fi networks by parsing `iwlist <interface> scan` output.
+
+    Returns:
+        list: (SSID, signal strength in dBm) pairs.
+    """
+    results = []
+    # Only SSIDs are decoded; the rest of the output stays bytes
+    result = subprocess.run(["iwlist", WIFI_SCAN_INTERFACE, "scan"], capture_output=True)
+    output = result.stdout
+    cells = output.split(b"Cell")
+    for cell in cells[1:]:
+        # One regex search per field instead of splitting the cell into lines twice
+        ssid_match = _ESSID_RE.search(cell)
+        signal_match = _SIGNAL_LEVEL_RE.search(cell)
+        if ssid_match and signal_match:
+            ssid = sys.intern(ssid_match.group(1).strip().strip(b'"').decode("utf-8", errors="replace"))
+            raw_signal = signal_match.group(1)
+
+            # Parse signal strength ("-45" from "-45 dBm", "60" from "60/100")
+            try:
+                signal = int(raw_signal.split(b"/")[0])
+            except ValueError:
+                logger.warning(f"Non-integer signal strength '{raw_signal.decode(errors='replace')}' for SSID '{ssid}'")
+                signal = 0
+
+            results.append((ssid, signal))
+    return results
+
+def detect_wifi(known_positions=None) -> List[Dict[str, any]]:
     """
     Scans for nearby Wi-Fi networks and returns a list of dictionaries
     containing SSID, signal strength, and estimated distances.
+
+    Uses nl80211 via pyroute2 when it is installed, falling back to iwlist.
+
+    Args:
+        known_positions (dict, optional): If given, only networks whose SSID
+            has a known position are returned, e.g. when only triangulating.
     """
     networks = []
     try:
-        result = subprocess.run(["iwlist", WIFI_SCAN_INTERFACE, "scan"], capture_output=True, text=True)
-        output = result.stdout
-        cells = output.split("Cell")
-        for cell in cells[1:]:
-            ssid_line = [line for line in cell.split("\n") if "ESSID" in line]
-            signal_line = [line for line in cell.split("\n") if "Signal level" in line]
-            if ssid_line and signal_line:
-                ssid = ssid_line[0].split(":")[1].strip().strip('"')
-                raw_signal = signal_line[0].split("=")[1].strip()
-
-                # Parse signal strength
-                try:
-                    signal = int(raw_signal.split("/")[0] if '/' in raw_signal else raw_signal.split()[0])
-                except ValueError:
-                    logger.warning(f"Non-integer signal strength '{raw_signal}' for SSID '{ssid}'")
-                    signal = 0
-
-                # Estimate distance
-                distance = calculate_distance(signal, PATH_LOSS_CONSTANTS["wifi"])
-
-                networks.append({"SSID": ssid, "signal": signal, "distance": distance})
+        scan = None
+        if IW is not None:
+            try:
+                scan = _scan_wifi_netlink()
+            except Exception as e:
+                logger.warning(f"nl80211 Wi-Fi scan failed, falling back to iwlist: {e}")
+        if scan is None:
+            scan = _scan_wifi_iwlist()
+
+        for ssid, signal in scan:
+            if known_positions is not None and ssid not in known_positions:
+                continue
+
+            # Estimate distance
+            distance = calculate_distance(signal, PATH_LOSS_CONSTANTS["wifi"])
+
+            networks.append({"SSID": ssid, "signal": signal, "distance": distance})
     except Exception as e:
         logger.error(f"Wi-Fi detection error: {e}")
     return networks
 
-def detect_bluetooth() -> List[Dict[str, any]]:
+def poll_wifi_signal():
     """
-    Scans for Bluetooth Low Energy (BLE) devices and returns a list of found devices
-    with their name, address, RSSI, and estimated distances.
+    Reads the signal level of the currently associated access point from
+    /proc/net/wireless, without forking a scan.
+
+    Cheap enough to call every frame; use detect_wifi() for neighbouring networks.
+
+    Returns:
+        int or None: Signal level in dBm, or None if the interface is not associated.
+    """
+    try:
+        with open(WIFI_PROC_PATH) as f:
+            lines = f.readlines()[2:]  # Skip the two header lines
+    except OSError as e:
+        logger.debug(f"Cannot read {WIFI_PROC_PATH}: {e}")
+        return None
+
+    for line in lines:
+        interface, _, stats = line.partition(":")
+        if interface.strip() == WIFI_SCAN_INTERFACE:
+            # Columns: status, link quality, signal level, noise, ...
+            fields = stats.split()
+            try:
+                return int(float(fields[2].rstrip(".")))
+            except (IndexError, ValueError):
+                logger.warning(f"Unexpected {WIFI_PROC_PATH} line: {line.strip()}")
+                return None
+    return None
+
+def _start_bluetooth_scanner():
+    """
+    Starts the persistent BLE scanner on its own event loop thread if it is not running.
+
+    Advertisements are recorded into _ble_sightings as they arrive, so each
+    scan reads recent sightings instead of spinning up a new event loop and
+    BlueZ scanner session. A scanner whose loop has stopped, or whose loop has
+    reported an unhandled error (e.g. BlueZ errors after bluetoothd restarts or
+    the adapter resets), is stopped and started again. A quiet scanner that
+    simply sees no advertisements is left running.
+
+    Raises:
+        Exception: If the scanner could not be started within BLE_START_TIMEOUT
+            seconds; the next call retries.
     """
-    async def scan_devices():
-        devices = []
+    global _ble_loop, _ble_scanner, _ble_scan_started
+    with _ble_start_lock:
+        if _ble_loop is not None:
+            if _ble_loop.is_running() and not _ble_failed.is_set():
+                return
+            logger.warning("BLE scanner failed; restarting it")
+            _stop_bluetooth_scanner()
 
         def detection_callback(device, advertisement_data):
-            rssi = advertisement_data.rssi
-            distance = calculate_distance(rssi, PATH_LOSS_CONSTANTS["bluetooth"])
-            devices.append({
-                "name": device.name or "Unknown",
-                "address": device.address,
-                "rssi": rssi,
-                "distance": distance
-            })
+            # Runs for every advertisement; record the raw fields only and
+            # leave distances and result dicts to detect_bluetooth()
+            sighting = (time.monotonic(), device.name, advertisement_data.rssi)
+            with _ble_sightings_lock:
+                _ble_sightings[sys.intern(device.address)] = sighting
+                _ble_sightings_lock.notify_all()
 
-        try:
+        async def start_scanner():
             scanner = BleakScanner(detection_callback=detection_callback)
             await scanner.start()
-            await asyncio.sleep(WIFI_SCAN_DURATION)  # Scan duration
-            await scanner.stop()
+            return scanner
+
+        def handle_loop_error(loop, context):
+            # Errors from bleak's backend tasks and callbacks end up here
+            logger.error(f"BLE scanner error: {context.get('exception') or context['message']}")
+            if loop is _ble_loop:
+                _ble_failed.set()
+
+        _ble_failed.clear()
+        loop = asyncio.new_event_loop()
+        loop.set_exception_handler(handle_loop_error)
+        threading.Thread(target=loop.run_forever, name="ble-scanner", daemon=True).start()
+        future = asyncio.run_coroutine_threadsafe(start_scanner(), loop)
+        try:
+            scanner = future.result(timeout=BLE_START_TIMEOUT)
         except Exception as e:
-            logger.error(f"Bluetooth detection error: {e}")
+            future.cancel()
+            # Stop one iteration later so the cancelled start can unwind first
+            loop.call_soon_threadsafe(loop.call_soon, loop.stop)
+            if isinstance(e, FutureTimeoutError):
+                raise TimeoutError(f"BLE scanner did not start within {BLE_START_TIMEOUT} seconds") from None
+            raise
+        _ble_loop = loop
+        _ble_scanner = scanner
+        _ble_scan_started = time.monotonic()
+
+def _stop_bluetooth_scanner():
+    """Stops the BLE scanner and its event loop; called with _ble_start_lock held."""
+    global _ble_loop, _ble_scanner
+    loop, scanner = _ble_loop, _ble_scanner
+    _ble_loop = _ble_scanner = None
+    if loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(scanner.stop(), loop).result(timeout=BLE_START_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Error stopping BLE scanner: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+def detect_bluetooth(target_addresses=None, known_positions=None) -> List[Dict[str, any]]:
+    """
+    Scans for Bluetooth Low Energy (BLE) devices and returns a list of found devices
+    with their name, address, RSSI, and estimated distances.
+
+    Returns the latest advertisement of each device seen by the persistent
+    scanner during the last WIFI_SCAN_DURATION seconds; the first call waits
+    for one full window.
+
+    Args:
+        target_addresses (set, optional): Stop waiting as soon as all of these
+            addresses have been seen instead of waiting out the window.
+        known_positions (dict, optional): If given, only devices whose address
+            has a known position are returned, e.g. when only triangulating.
+    """
+    try:
+        _start_bluetooth_scanner()
+    except Exception as e:
+        logger.error(f"Bluetooth detection error: {e}")
+        return []
+
+    targets = set(target_addresses or ())
 
-        return devices
+    def all_targets_seen():
+        return bool(targets) and targets <= _ble_sightings.keys()
 
-    return asyncio.run(scan_devices())
+    # Give a freshly started scanner one scan window to collect advertisements,
+    # waking on each new sighting to check whether every target has shown up
+    with _ble_sightings_lock:
+        remaining = _ble_scan_started + WIFI_SCAN_DURATION - time.monotonic()
+        if remaining > 0:
+            _ble_sightings_lock.wait_for(all_targets_seen, timeout=remaining)
+
+        # Drop devices that have not advertised within the window
+        cutoff = time.monotonic() - WIFI_SCAN_DURATION
+        for address in [address for address, (seen, _, _) in _ble_sightings.items() if seen < cutoff]:
+            del _ble_sightings[address]
+        latest = [
+            (address, name, rssi) for address, (_, name, rssi) in _ble_sightings.items()
+            if known_positions is None or address in known_positions
+        ]
+
+    constants = PATH_LOSS_CONSTANTS["bluetooth"]
+    return [
+        {
+            "name": name or "Unknown",
+            "address": address,
+            "rssi": rssi,
+            "distance": calculate_distance(rssi, constants),
+        }
+        for address, name, rssi in latest
+    ]
+
+def scan_all(target_addresses=None, known_positions=None) -> Tuple[List[Dict[str, any]], List[Dict[str, any]]]:
+    """
+    Runs a Wi-Fi scan and a BLE scan concurrently.
+
+    Args:
+        target_addresses (set, optional): Passed through to detect_bluetooth().
+        known_positions (dict, optional): Passed through to both scans.
+
+    Returns:
+        tuple: (Wi-Fi results, Bluetooth results), as from detect_wifi() and detect_bluetooth().
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        wifi_future = executor.submit(detect_wifi, known_positions)
+        bluetooth_results = detect_bluetooth(target_addresses, known_positions)
+        return wifi_future.result(), bluetooth_results
 
 def calculate_distance(signal: int, constants: Dict[str, int]) -> float:
     """
@@ -95,12 +321,38 @@ def calculate_distance(signal: int, constants: Dict[str, int]) -> float:
     try:
         A = constants["A"]
         n = constants["n"]
-        distance = 10 ** ((A - signal) / (10 * n))
-        return round(distance, 2)
+        # Integer RSSIs under the built-in models are a table lookup
+        table = _DISTANCE_TABLES.get((A, n))
+        if table is not None and type(signal) is int and -128 <= signal < 128:
+            return table[signal + 128]
+        return _path_loss_distance(signal, A, n)
     except Exception as e:
         logger.warning(f"Error calculating distance: {e}")
         return float('inf')  # Return infinity if calculation fails
 
+@lru_cache(maxsize=2048)
+def _path_loss_distance(signal: float, A: float, n: float) -> float:
+    """Path loss distance for models without a lookup table; RSSIs repeat a lot, so results are memoized."""
+    return 10 ** ((A - signal) / (10 * n))
+
+def _distance_table(A, n):
+    """Distances for every integer RSSI in [-128, 127], indexed by rssi + 128."""
+    return [10 ** ((A - rssi) / (10 * n)) for rssi in range(-128, 128)]
+
+# RSSI -> distance lookup tables for the built-in path loss models, keyed by (A, n)
+_DISTANCE_TABLES = {
+    (c["A"], c["n"]): _distance_table(c["A"], c["n"]) for c in PATH_LOSS_CONSTANTS.values()
+}
+
+def _triangulation_arrays(matches):
+    """Pack (position, distance, name) matches into triangulate()-ready arrays."""
+    positions, distances, names = zip(*matches) if matches else ((), (), ())
+    return {
+        "positions": np.array(positions, dtype=np.float64).reshape(-1, 2),
+        "distances": np.array(distances, dtype=np.float64),
+        "names": list(names),
+    }
+
 def prepare_triangulation_data(wifi_results, bluetooth_results, known_positions):
     """
     Prepares Wi-Fi and Bluetooth data for triangulation by mapping devices to known positions.
@@ -111,32 +363,25 @@ def prepare_triangulation_data(wifi_results, bluetooth_results, known_positions)
         known_positions (dict): Mapping of device addresses/SSIDs to positions.
 
     Returns:
-        dict: Contains triangulation-ready Wi-Fi and Bluetooth devices.
+        dict: For "wifi" and "bluetooth", a dict with "positions" (N x 2 array),
+            "distances" (N array) and "names" (list), ready for triangulate().
     """
-    wifi_triangulation = []
-    bluetooth_triangulation = []
+    wifi_matches = []
+    bluetooth_matches = []
 
     for wifi in wifi_results:
         ssid = wifi.get("SSID")
         if ssid in known_positions and wifi.get("distance") is not None:
-            wifi_triangulation.append({
-                "position": known_positions[ssid],
-                "distance": wifi["distance"],
-                "name": ssid,
-            })
+            wifi_matches.append((known_positions[ssid], wifi["distance"], ssid))
 
     for bluetooth in bluetooth_results:
         address = bluetooth.get("address")
         if address in known_positions and bluetooth.get("distance") is not None:
-            bluetooth_triangulation.append({
-                "position": known_positions[address],
-                "distance": bluetooth["distance"],
-                "name": bluetooth.get("name"),
-            })
+            bluetooth_matches.append((known_positions[address], bluetooth["distance"], bluetooth.get("name")))
 
     return {
-        "wifi": wifi_triangulation,
-        "bluetooth": bluetooth_triangulation,
+        "wifi": _triangulation_arrays(wifi_matches),
+        "bluetooth": _triangulation_arrays(bluetooth_matches),
     }
 
 if __name__ == "__main__":
@@ -145,15 +390,11 @@ if __name__ == "__main__":
         "FlipperZero": (5, 5),
     }
 
-    # Test Wi-Fi detection
-    logger.info("Scanning for Wi-Fi networks...")
-    wifi_results = detect_wifi()
+    # Test Wi-Fi and Bluetooth detection, scanning both at once
+    logger.info("Scanning for Wi-Fi networks and Bluetooth devices...")
+    wifi_results, bluetooth_results = scan_all()
     for wifi in wifi_results:
         logger.info(f"Wi-Fi: {wifi}")
-
-    # Test Bluetooth detection
-    logger.info("Scanning for Bluetooth devices...")
-    bluetooth_results = detect_bluetooth()
     for bluetooth in bluetooth_results:
         logger.info(f"Bluetooth: {bluetooth}")
 
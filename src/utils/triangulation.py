@@ -11,21 +11,83 @@ def rssi_to_distance(rssi, A=-40, n=2):
     """
     Converts RSSI to distance using a propagation model.
 
+    Array arguments broadcast elementwise, like a NumPy ufunc.
+
     Args:
-        rssi (int): Signal strength in dBm.
-        A (int): RSSI at 1 meter.
-        n (int): Path-loss exponent.
+        rssi (int or array-like): Signal strength in dBm.
+        A (int or array-like): RSSI at 1 meter.
+        n (int or array-like): Path-loss exponent.
 
     Returns:
-        float: Estimated distance in meters.
+        float or numpy.ndarray: Estimated distance in meters; for arrays,
+            invalid inputs give non-finite entries.
     """
     try:
-        distance = 10 ** ((A - rssi) / (10 * n))
-        return round(distance, 2)
+        if np.ndim(rssi) or np.ndim(A) or np.ndim(n):
+            rssi, A, n = (np.asarray(x, dtype=np.float64) for x in (rssi, A, n))
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                return np.power(10.0, (A - rssi) / (10.0 * n))
+        return 10 ** ((A - rssi) / (10 * n))
     except Exception as e:
         logger.error(f"Error in RSSI to distance calculation: {e}")
         return None
 
+def _solve_normal_2x2(A, b):
+    """
+    Solve the 2x2 normal equations (A^T A) x = A^T b in closed form.
+
+    Args:
+        A (numpy.ndarray): System matrix, shape (N, 2).
+        b (numpy.ndarray): Right-hand side, shape (N,).
+
+    Returns:
+        numpy.ndarray or None: Solution (x, y), or None if A^T A is singular or nearly so.
+    """
+    (a00, a01), (_, a11) = A.T @ A
+    r0, r1 = A.T @ b
+    det = a00 * a11 - a01 * a01
+    # Relative threshold: nearly collinear anchors leave det at rounding-error size
+    if not np.isfinite(det) or det <= 1e-12 * a00 * a11:
+        return None
+    return np.array([(a11 * r0 - a01 * r1) / det, (a00 * r1 - a01 * r0) / det])
+
+def _refine(x0, P, d, iters=4):
+    """
+    Refine a position estimate with Gauss-Newton iterations on the range residuals.
+
+    Args:
+        x0 (numpy.ndarray): Initial (x, y) estimate, e.g. from the linear solve.
+        P (numpy.ndarray): Scanning device positions, shape (N, 2).
+        d (numpy.ndarray): Distances from each scanning device, shape (N,).
+        iters (int): Maximum number of iterations.
+
+    Returns:
+        numpy.ndarray: Refined (x, y) estimate; never worse than x0 in squared range error.
+    """
+    def residuals(x):
+        return np.linalg.norm(x - P, axis=1) - d
+
+    x = x0.copy()
+    cost = np.square(residuals(x)).sum()
+    for _ in range(iters):
+        delta = x - P
+        ranges = np.maximum(np.linalg.norm(delta, axis=1), 1e-9)
+        J = delta / ranges[:, None]
+        step = _solve_normal_2x2(J, ranges - d)
+        if step is None:
+            break
+
+        # Only take steps that reduce the squared range error; with few or badly
+        # placed anchors a full Gauss-Newton step can overshoot
+        candidate = x - step
+        candidate_cost = np.square(residuals(candidate)).sum()
+        if not candidate_cost < cost:
+            break
+        x, cost = candidate, candidate_cost
+        if np.abs(step).max() < 1e-6:
+            break
+    return x
+
 def triangulate(positions, distances):
     """
     Compute the 2D position of a signal source using multilateration.
@@ -41,25 +103,22 @@ def triangulate(positions, distances):
         logger.error("At least 3 scanning devices are required for triangulation.")
         return None
 
-    A = []
-    b = []
-
     try:
-        for i in range(1, len(positions)):
-            x1, y1 = positions[0]
-            x2, y2 = positions[i]
-            d1 = distances[0]
-            d2 = distances[i]
+        P = np.asarray(positions, dtype=np.float64)
+        d = np.asarray(distances, dtype=np.float64)
 
-            A.append([2 * (x2 - x1), 2 * (y2 - y1)])
-            b.append(d1**2 - d2**2 - x1**2 - y1**2 + x2**2 + y2**2)
+        # Subtract the first circle equation from the others to get a linear system
+        A = 2 * (P[1:] - P[0])
+        b = d[0]**2 - d[1:]**2 - (P[0]**2).sum() + (P[1:]**2).sum(axis=1)
 
-        A = np.array(A)
-        b = np.array(b).reshape(-1, 1)
+        # Solve the 2x2 normal equations; fall back to lstsq if the anchors are collinear
+        result = _solve_normal_2x2(A, b)
+        if result is None:
+            result = np.linalg.lstsq(A, b, rcond=None)[0]
 
-        # Solve the linear system Ax = b
-        result = np.linalg.lstsq(A, b, rcond=None)[0]
-        return result[0][0], result[1][0]  # Estimated (x, y) position
+        # The linearization is biased under noisy distances; refine on the actual ranges
+        result = _refine(result, P, d)
+        return result[0], result[1]  # Estimated (x, y) position
     except Exception as e:
         logger.error(f"Error in triangulation: {e}")
         return None
@@ -80,8 +139,10 @@ def calculate_distances_and_triangulate(devices):
     Returns:
         tuple: Estimated (x, y) position of the signal source, or None if triangulation fails.
     """
-    positions = []
-    distances = []
+    # Filled by index up to `count`; skipped devices leave unused rows at the end
+    positions = np.empty((len(devices), 2), dtype=np.float64)
+    params = np.empty((len(devices), 3), dtype=np.float64)  # (rssi, A, n) per usable device
+    count = 0
 
     for device in devices:
         position = device.get("position")
@@ -90,15 +151,25 @@ def calculate_distances_and_triangulate(devices):
         n = device.get("n", 2)    # Allow custom path-loss exponent
 
         if position and rssi is not None:
-            distance = rssi_to_distance(rssi, A=A, n=n)
-            if distance is not None:
-                positions.append(position)
-                distances.append(distance)
-            else:
+            try:
+                params[count] = (float(rssi), float(A), float(n))
+                positions[count] = position
+                count += 1
+            except (TypeError, ValueError):
                 logger.warning(f"Invalid distance calculated for device at position {position} with RSSI {rssi}.")
         else:
             logger.warning(f"Missing position or RSSI for device: {device}")
 
+    # Convert every RSSI to a distance in one vectorized pass
+    positions = positions[:count]
+    rssi, A, n = params[:count].T
+    distances = rssi_to_distance(rssi, A, n)
+    valid = np.isfinite(distances)
+    for i in np.flatnonzero(~valid):
+        logger.warning(f"Invalid distance calculated for device at position {positions[i]} with RSSI {rssi[i]}.")
+    positions = positions[valid]
+    distances = distances[valid]
+
     if len(positions) >= 3:
         return triangulate(positions, distances)
     else:
@@ -117,6 +188,7 @@ if __name__ == "__main__":
 
     estimated_position = calculate_distances_and_triangulate(devices)
     if estimated_position:
-        logger.info(f"Estimated position of the signal source: {estimated_position}")
+        x, y = estimated_position
+        logger.info(f"Estimated position of the signal source: ({x:.2f}, {y:.2f})")
     else:
         logger.error("Failed to estimate position.")
@@ -8,24 +8,21 @@ def main():
         print("Cannot open camera")
         return
 
-    print("Camera successfully opened. Saving frames to disk...")
+    print("Camera successfully opened. Saving a frame to disk...")
 
-    while True:
-        # Capture frame-by-frame
+    try:
+        # Capture a single frame
         ret, frame = camera.read()
-
-        # If frame reading was not successful, break the loop
         if not ret:
             print("Failed to grab frame")
-            break
+            return
 
         # Save the frame to disk
         cv2.imwrite('frame.jpg', frame)
         print("Saved frame to frame.jpg")
-        break  # Exit after saving one frame
-
-    # When everything done, release the capture
-    camera.release()
+    finally:
+        # When everything done, release the capture
+        camera.release()
 
 if __name__ == "__main__":
     main()